@@ -3,7 +3,7 @@
 This example demonstrates how SmartAsync enables async applications
 to seamlessly call synchronous legacy libraries without blocking the event loop.
 
-The sync methods are automatically offloaded to a thread pool using asyncio.to_thread().
+The sync methods are automatically offloaded to the default thread pool executor.
 """
 
 import asyncio
@@ -10,8 +10,10 @@ Recommended usage:
         pass
 """
 
+from .core import gather_sync as gather_sync
+from .core import reset_all_caches as reset_all_caches
 from .core import smartasync as smartasync
 
 __version__ = "0.5.0"
 
-__all__ = ["smartasync"]
+__all__ = ["gather_sync", "reset_all_caches", "smartasync"]
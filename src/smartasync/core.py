@@ -4,146 +4,280 @@ Automatic context detection for methods that work in both sync and async context
 """
 
 import asyncio
-import functools
+import contextvars
+import os
+import threading
+import weakref
+from asyncio import _get_running_loop
+from functools import partial, update_wrapper
+from inspect import isawaitable
 
+_copy_context = contextvars.copy_context
 
-def smartasync(method):
+# Every live wrapper with an async-context cache (see reset_all_caches).
+# Weak: wrappers created dynamically are not kept alive by the registry.
+_WRAPPERS = weakref.WeakSet()
+
+
+# Per-thread event loop reused by sync-context calls (see _run_sync)
+_TLS = threading.local()
+# Every live holder, across threads (see _forget_loops_after_fork)
+_HOLDERS = weakref.WeakSet()
+
+
+class _LoopHolder:
+    """Owns a thread's reusable loop: the loop is closed when the holder dies.
+
+    The holder lives only in _TLS, so it is dropped when its thread exits;
+    weakref.finalize then closes the loop (or at interpreter exit, if the
+    thread is still alive).
+    """
+
+    __slots__ = ("loop", "finalizer", "__weakref__")
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.finalizer = weakref.finalize(self, _close_loop, self.loop)
+        _HOLDERS.add(self)
+
+
+def _forget_loops_after_fork():
+    """Drop the parent's loops in a forked child.
+
+    The child shares their selector (epoll fd) and self-pipe with the parent,
+    so using them could swallow the parent's wakeups. They are not closed
+    either: closing would unregister the parent's fds from the shared selector.
+    """
+    for holder in list(_HOLDERS):
+        holder.finalizer.detach()
+    _HOLDERS.clear()
+    _TLS.__dict__.pop("holder", None)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_loops_after_fork)
+
+
+def _close_loop(loop):
+    """Shut down async generators and close a loop created by _run_sync()."""
+    if not loop.is_closed() and not loop.is_running():
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+
+
+def _cancel_pending(loop):
+    """Cancel the tasks a call left on loop, as asyncio.run() does."""
+    tasks = asyncio.all_tasks(loop)
+    if not tasks:
+        return
+    for task in tasks:
+        task.cancel()
+    loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+    for task in tasks:
+        if not task.cancelled() and task.exception() is not None:
+            loop.call_exception_handler(
+                {
+                    "message": "unhandled exception during smartasync shutdown",
+                    "exception": task.exception(),
+                    "task": task,
+                }
+            )
+
+
+def _run_sync(coro):
+    """Run coro to completion on this thread's reusable event loop.
+
+    Used instead of asyncio.run(), which creates and tears down a new loop
+    (selector, signal wakeup, executor) on every call. The loop is created
+    lazily once per thread and closed when the thread exits. As with
+    asyncio.run(), tasks still pending when coro returns are cancelled.
+    """
+    holder = getattr(_TLS, "holder", None)
+    if holder is None or holder.loop.is_closed():
+        holder = _TLS.holder = _LoopHolder()
+    loop = holder.loop
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        _cancel_pending(loop)
+
+
+def reset_all_caches():
+    """Reset the async-context cache of every decorated callable.
+
+    Useful in tests, to start from a clean state after an event loop has run.
+    A single async callable can be reset with ``func._cache[0] = False``
+    (sync callables detect the context on every call and have no cache).
+    """
+    for wrapper in list(_WRAPPERS):
+        wrapper._cache[0] = False
+
+
+async def _to_thread(loop, func, args, kwargs):
+    """Run func in loop's default executor, as asyncio.to_thread() does.
+
+    Takes the loop the wrapper already looked up instead of fetching it again.
+    Stays a coroutine, so callers can pass it to asyncio.create_task() and
+    TaskGroup.create_task(). The call always runs inside a copy of the
+    caller's context, even an empty one, so context variables set by func
+    never leak into the worker thread's own context.
+    """
+    ctx = _copy_context()
+    return await loop.run_in_executor(None, partial(ctx.run, func, *args, **kwargs))
+
+
+def _call_all(calls):
+    results = []
+    for call in calls:
+        result = call()
+        if isawaitable(result):
+            # e.g. a decorated async callable whose cache already saw a loop
+            close = getattr(result, "close", None)
+            if close is not None:
+                close()
+            raise TypeError(
+                f"gather_sync() accepts only sync callables: {call!r} returned {result!r}"
+            )
+        results.append(result)
+    return results
+
+
+async def gather_sync(*calls):
+    """Run several sync callables in a single executor job, in order.
+
+    Each ``await sync_method(...)`` from async context is a separate thread
+    pool submission. For many cheap calls the scheduling dominates: this
+    helper submits them once and runs them sequentially in one worker thread.
+
+    Args:
+        *calls: Zero-argument sync callables (e.g. ``functools.partial`` or
+            lambdas). Decorated sync callables run inline: the worker thread
+            has no loop. Async callables are not accepted.
+
+    Returns:
+        List of results, in the order of ``calls``.
+
+    Raises:
+        TypeError: If a call returns an awaitable (it is closed first).
+
+    Example:
+        results = await gather_sync(
+            partial(db.query, "k1"),
+            partial(db.query, "k2"),
+        )
+    """
+    return await _to_thread(_get_running_loop(), _call_all, (calls,), {})
+
+
+def smartasync(method=None, *, thread_offload=True):
     """Bidirectional decorator for methods and functions that work in both sync and async contexts.
 
-    Automatically detects whether the code is running in an async or sync
-    context and adapts accordingly. Works in BOTH directions:
-    - Async methods/functions called from sync context (uses asyncio.run)
-    - Sync methods/functions called from async context (uses asyncio.to_thread)
-
-    Features:
-    - Auto-detection of sync/async context using asyncio.get_running_loop()
-    - Asymmetric caching: caches True (async), always checks False (sync)
-    - Enhanced error handling with clear messages
-    - Works with both async and sync methods and standalone functions
-    - No configuration needed - just apply the decorator
-    - Prevents blocking event loop when calling sync methods from async context
-
-    How it works:
-    - At import time: Checks if method is async using asyncio.iscoroutinefunction()
-    - At runtime: Detects if running in async context (checks for event loop)
-    - Asymmetric cache: Once async context is detected (True), it's cached forever
-    - Sync context (False) is never cached, always re-checked
-    - This allows transitioning from sync → async, but not async → sync (which is correct)
-    - Uses pattern matching to dispatch based on (has_loop, is_coroutine)
+    Whether the callable is async is checked once, at decoration time; whether
+    an event loop is running is checked at call time (async context is cached
+    for async callables). See docs/how-it-works for the full design.
 
     Execution scenarios (async_context, async_method):
-    - (False, True):  Sync context + Async method → Execute with asyncio.run()
+    - (False, True):  Sync context + Async method → Run on the thread's reusable loop
     - (False, False): Sync context + Sync method → Direct call (pass-through)
     - (True, True):   Async context + Async method → Return coroutine (for await)
-    - (True, False):  Async context + Sync method → Offload to thread (asyncio.to_thread)
+    - (True, False):  Async context + Sync method → Offload to thread (coroutine)
 
     Args:
         method: Method or function to decorate (async or sync)
+        thread_offload: If False, sync callables are returned unwrapped and
+            always run inline, even from async context (no thread offloading).
+            Use for sync code that is only ever called from sync context.
 
     Returns:
-        Wrapped function that works in both sync and async contexts
+        Wrapped function that works in both sync and async contexts.
+        When called with only keyword arguments (``@smartasync(...)``),
+        returns the decorator.
 
-    Example with class methods:
+    Example:
         class Manager:
             @smartasync
-            async def async_configure(self, config: dict) -> None:
-                # Async implementation uses await
+            async def configure(self, config: dict) -> None:
                 await self._async_setup(config)
 
             @smartasync
-            def sync_process(self, data: str) -> str:
-                # Sync implementation (e.g., CPU-bound or legacy code)
+            def process(self, data: str) -> str:
                 return process_legacy(data)
 
-        # Sync context usage
         manager = Manager()
-        manager.async_configure({...})  # No await needed! Uses asyncio.run()
-        result = manager.sync_process("data")  # Direct call
+        manager.configure({...})  # Sync context: no await needed
+        result = manager.process("data")  # Direct call
 
-        # Async context usage
-        async def main():
-            manager = Manager()
-            await manager.async_configure({...})  # Normal await
-            result = await manager.sync_process("data")  # Offloaded to thread!
-
-    Example with standalone functions:
-        @smartasync
-        async def fetch_data(url: str) -> dict:
-            # Async function
-            return await http_client.get(url)
-
-        @smartasync
-        def process_cpu_intensive(data: list) -> list:
-            # Sync function (CPU-bound)
-            return [expensive_computation(x) for x in data]
-
-        # Sync context
-        data = fetch_data("https://api.example.com")  # No await needed!
-        result = process_cpu_intensive(data)
-
-        # Async context
         async def main():
-            data = await fetch_data("https://api.example.com")  # Normal await
-            result = await process_cpu_intensive(data)  # Offloaded to thread!
+            await manager.configure({...})  # Normal await
+            result = await manager.process("data")  # Offloaded to thread
     """
+    if method is None:
+        return partial(smartasync, thread_offload=thread_offload)
+
     # Import time: Detect if method is async
     is_coro = asyncio.iscoroutinefunction(method)
 
-    # Asymmetric cache: only cache True (async context found)
-    _cached_has_loop = False
+    if not is_coro and not thread_offload:
+        # Nothing to adapt: plain pass-through, no wrapper layer
+        return method
+
+    # Dispatch is specialized at import time: each wrapper only holds the
+    # two (async_context, async_method) arms reachable for its method.
+    if is_coro:
+        return _make_coro_wrapper(method)
+    return _make_sync_wrapper(method)
+
+
+def _make_coro_wrapper(method):
+    """Wrap an async callable: coroutine in async context, run to completion in sync."""
+    # Bound once as closure locals: the hot path does no global/attribute lookups.
+    # _get_loop is the same check as asyncio.get_running_loop(), without raising.
+    _get_loop = _get_running_loop
+    _run = _run_sync
+
+    # Asymmetric cache: only cache True (async context found).
+    # A one-element list avoids rebinding a nonlocal cell on the hot path.
+    _cache = [False]
 
-    @functools.wraps(method)
     def wrapper(*args, **kwargs):
-        nonlocal _cached_has_loop
-
-        # Context detection with asymmetric caching
-        if _cached_has_loop:
-            async_context = True
-        else:
-            try:
-                asyncio.get_running_loop()
-                # Found event loop! Cache it forever
-                async_context = True
-                _cached_has_loop = True
-            except RuntimeError:
-                # No event loop - sync context
-                # Don't cache False, always re-check next time
-                async_context = False
-
-        async_method = is_coro
-
-        # Dispatch based on (async_context, async_method) using pattern matching
-        match (async_context, async_method):
-            case (False, True):
-                # Sync context + Async method → Run with asyncio.run()
-                coro = method(*args, **kwargs)
-                try:
-                    return asyncio.run(coro)
-                except RuntimeError as e:
-                    if "cannot be called from a running event loop" in str(e):
-                        raise RuntimeError(
-                            f"Cannot call {method.__name__}() synchronously from within "
-                            f"an async context. Use 'await {method.__name__}()' instead."
-                        ) from e
-                    raise
-
-            case (False, False):
-                # Sync context + Sync method → Direct call (pass-through)
-                return method(*args, **kwargs)
-
-            case (True, True):
-                # Async context + Async method → Return coroutine to be awaited
-                return method(*args, **kwargs)
-
-            case (True, False):
-                # Async context + Sync method → Offload to thread (don't block event loop)
-                return asyncio.to_thread(method, *args, **kwargs)
-
-    # Add cache reset method for testing
-    def reset_cache():
-        nonlocal _cached_has_loop
-        _cached_has_loop = False
-
-    wrapper._smartasync_reset_cache = reset_cache
+        if _cache[0] or _get_loop() is not None:
+            # (True, True): Async context + Async method → Return coroutine
+            _cache[0] = True
+            return method(*args, **kwargs)
+
+        # (False, True): Sync context + Async method → Run on the thread's loop
+        # No loop is running in this thread (just checked): errors propagate as-is.
+        # Don't cache False, always re-check next time
+        return _run(method(*args, **kwargs))
+
+    return _finish_wrapper(wrapper, method, _cache)
+
+
+def _make_sync_wrapper(method):
+    """Wrap a sync callable: direct call in sync context, thread in async.
+
+    No async-context cache here: offloading needs the loop object anyway, so
+    the wrapper looks it up on every call.
+    """
+    _get_loop = _get_running_loop
+    _offload = _to_thread
+
+    def wrapper(*args, **kwargs):
+        loop = _get_loop()
+        if loop is None:
+            # (False, False): Sync context + Sync method → Direct call (pass-through)
+            return method(*args, **kwargs)
+
+        # (True, False): Async context + Sync method → Offload to thread (coroutine)
+        return _offload(loop, method, args, kwargs)
+
+    return _finish_wrapper(wrapper, method)
+
 
+def _finish_wrapper(wrapper, method, cache=None):
+    """Copy metadata and register the cache, if any (exposed as wrapper._cache)."""
+    update_wrapper(wrapper, method)
+    if cache is not None:
+        _WRAPPERS.add(wrapper)
+        wrapper._cache = cache
     return wrapper
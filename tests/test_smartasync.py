@@ -1,10 +1,11 @@
 """Test @smartasync decorator in standalone context."""
 
 import asyncio
+import os
 
 import pytest
 
-from smartasync import smartasync
+from smartasync import gather_sync, reset_all_caches, smartasync
 
 
 class SimpleManager:
@@ -171,7 +172,7 @@ def test_cache_reset():
 
     # Create fresh object and reset cache to ensure clean state
     obj = SimpleManager()
-    obj.async_method._smartasync_reset_cache()
+    obj.async_method._cache[0] = False
 
     print("\n1. First call...")
     result = obj.async_method("test1")
@@ -179,7 +180,7 @@ def test_cache_reset():
     print("   ✓ Works!")
 
     print("\n2. Reset cache...")
-    obj.async_method._smartasync_reset_cache()
+    obj.async_method._cache[0] = False
     print("   ✓ Cache reset!")
 
     print("\n3. Call again after reset...")
@@ -215,30 +216,103 @@ def test_error_propagation():
     print("\n✅ ERROR PROPAGATION TEST PASSED!")
 
 
-def test_sync_async_method_when_loop_running(monkeypatch):
-    """Ensure helpful error when asyncio.run() is called while a loop is active.
+def test_sync_context_reuses_thread_loop():
+    """Test that sync-context calls reuse one event loop per thread."""
+    import gc
+    import threading
 
-    Defensive test - simulates unlikely edge case for 100% coverage.
-    """
-    obj = SimpleManager()
-    obj.async_method._smartasync_reset_cache()
+    @smartasync
+    async def current_loop():
+        return asyncio.get_running_loop()
 
-    def fake_asyncio_run(coro):
-        try:
-            coro.close()
-        finally:
-            raise RuntimeError(
-                "asyncio.run() cannot be called from a running event loop"
-            )
+    loop = current_loop()
+    assert current_loop() is loop
+    assert not loop.is_running()
+
+    # Another thread gets its own loop
+    other = []
+    thread = threading.Thread(target=lambda: other.append(current_loop()))
+    thread.start()
+    thread.join()
+    assert other[0] is not loop
+
+    # The thread's loop is closed when the thread exits
+    gc.collect()
+    assert other[0].is_closed()
+
+    # A closed loop is replaced transparently
+    loop.close()
+    new_loop = current_loop()
+    assert new_loop is not loop
+    assert not new_loop.is_closed()
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires os.fork()")
+@pytest.mark.filterwarnings("ignore:.*fork.*:DeprecationWarning")
+def test_sync_context_forked_child_gets_own_loop():
+    """Test that a forked child does not reuse the parent's loop."""
+
+    @smartasync
+    async def current_loop():
+        return asyncio.get_running_loop()
+
+    loop = current_loop()
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:  # Child: report, then exit without running pytest teardown
+        os.close(read_fd)
+        child_loop = current_loop()
+        ok = child_loop is not loop and not loop.is_closed()
+        os.write(write_fd, b"1" if ok else b"0")
+        os._exit(0)
 
-    monkeypatch.setattr(asyncio, "run", fake_asyncio_run)
+    os.close(write_fd)
+    with os.fdopen(read_fd, "rb") as pipe:
+        assert pipe.read() == b"1"
+    os.waitpid(pid, 0)
 
-    with pytest.raises(RuntimeError) as excinfo:
-        obj.async_method("boom")
+    # The child left the parent's loop open and usable
+    assert current_loop() is loop
+
+
+def test_sync_context_cancels_pending_tasks():
+    """Test that tasks left pending by a sync-context call are cancelled."""
+    started = []
+
+    async def forever():
+        started.append(True)
+        await asyncio.sleep(3600)
+
+    @smartasync
+    async def spawn():
+        task = asyncio.get_running_loop().create_task(forever())
+        await asyncio.sleep(0)
+        return task
+
+    task = spawn()
+    assert started == [True]
+    assert task.cancelled()
+
+
+def test_sync_context_reports_errors_from_cancelled_tasks(caplog):
+    """Test that a leftover task failing on cancellation is reported, not lost."""
+
+    async def stubborn():
+        try:
+            await asyncio.sleep(3600)
+        except asyncio.CancelledError:
+            raise ValueError("cleanup failed") from None
+
+    @smartasync
+    async def spawn():
+        asyncio.get_running_loop().create_task(stubborn())
+        await asyncio.sleep(0)
+        return "done"
 
-    message = str(excinfo.value)
-    assert "Cannot call async_method() synchronously from within an async context" in message
-    assert "Use 'await async_method()' instead." in message
+    with caplog.at_level("ERROR", logger="asyncio"):
+        assert spawn() == "done"
+    assert "unhandled exception during smartasync shutdown" in caplog.text
+    assert "cleanup failed" in caplog.text
 
 
 async def test_error_propagation_async():
@@ -273,7 +347,7 @@ def test_cache_shared_between_instances():
 
     # Reset cache first to ensure clean state
     obj_temp = SimpleManager()
-    obj_temp.async_method._smartasync_reset_cache()
+    obj_temp.async_method._cache[0] = False
 
     print("\n1. Create two instances...")
     obj1 = SimpleManager()
@@ -293,6 +367,43 @@ def test_cache_shared_between_instances():
     print("\n✅ CACHE SHARING TEST PASSED!")
 
 
+def test_reset_all_caches():
+    """Test that reset_all_caches() clears the cache of every decorated method."""
+    obj = SimpleManager()
+
+    async def warm_up():
+        await obj.async_method("warm")
+
+    asyncio.run(warm_up())
+
+    # The async method's cache now claims an async context (sync methods have none)
+    assert obj.async_method._cache[0] is True
+    reset_all_caches()
+    assert obj.async_method._cache[0] is False
+
+    assert obj.async_method("sync") == "Result: sync"
+
+
+def test_cache_registry_does_not_keep_wrappers_alive():
+    """Test that dynamically decorated callables are dropped from the registry."""
+    import gc
+
+    from smartasync.core import _WRAPPERS
+
+    gc.collect()
+    before = len(_WRAPPERS)
+
+    for _ in range(100):
+
+        @smartasync
+        async def handler():
+            pass
+
+    del handler
+    gc.collect()
+    assert len(_WRAPPERS) == before
+
+
 async def test_sync_to_async_transition():
     """Test transition from sync to async context."""
     print("\n" + "=" * 60)
@@ -301,7 +412,7 @@ async def test_sync_to_async_transition():
 
     # Reset cache to start fresh
     obj = SimpleManager()
-    obj.async_method._smartasync_reset_cache()
+    obj.async_method._cache[0] = False
 
     print("\n1. First call in async context...")
     result = await obj.async_method("async-test")
@@ -441,6 +552,166 @@ async def test_standalone_sync_function_in_async():
     print("\n✅ STANDALONE SYNC FUNCTION (ASYNC) TEST PASSED!")
 
 
+async def test_sync_method_in_create_task():
+    """Test sync methods called from async context can be scheduled as tasks."""
+    obj = SimpleManager()
+
+    coro = obj.sync_method("task")
+    assert asyncio.iscoroutine(coro)
+    assert await asyncio.create_task(coro) == "Sync: task"
+
+    if hasattr(asyncio, "TaskGroup"):  # Python 3.11+
+        async with asyncio.TaskGroup() as tg:
+            task = tg.create_task(obj.sync_method("group"))
+        assert task.result() == "Sync: group"
+
+
+def test_sync_function_in_async_kwargs_and_contextvars():
+    """Test thread offloading forwards kwargs and propagates context variables."""
+    import contextvars
+
+    request_id = contextvars.ContextVar("request_id", default=None)
+
+    @smartasync
+    def describe(prefix: str, suffix: str = "") -> str:
+        return f"{prefix}-{request_id.get()}{suffix}"
+
+    async def main(value):
+        if value is not None:
+            request_id.set(value)
+        return [await describe("args"), await describe("kwargs", suffix="!")]
+
+    # Run each loop from a fresh, empty context
+    assert contextvars.Context().run(asyncio.run, main(None)) == ["args-None", "kwargs-None!"]
+    assert contextvars.Context().run(asyncio.run, main("req-42")) == [
+        "args-req-42",
+        "kwargs-req-42!",
+    ]
+
+
+async def test_thread_offload_disabled():
+    """Test @smartasync(thread_offload=False) leaves sync callables unwrapped."""
+
+    def plain(value: str) -> str:
+        return f"plain-{value}"
+
+    @smartasync(thread_offload=False)
+    async def fetch(value: str) -> str:
+        await asyncio.sleep(0.01)
+        return f"fetched-{value}"
+
+    assert smartasync(thread_offload=False)(plain) is plain
+    assert plain("inline") == "plain-inline"  # Runs inline, nothing to await
+    assert await fetch("async") == "fetched-async"
+
+
+def test_wrapper_metadata():
+    """Test that the wrapper keeps the metadata of the decorated callable."""
+    import inspect
+
+    method = SimpleManager.async_method
+    assert method.__name__ == "async_method"
+    assert method.__qualname__ == "SimpleManager.async_method"
+    assert method.__module__ == __name__
+    assert method.__doc__ == "Async method decorated with @smartasync."
+    assert method.__annotations__ == {"value": str, "return": str}
+    assert list(inspect.signature(method).parameters) == ["self", "value"]
+
+
+async def test_gather_sync():
+    """Test gather_sync() runs sync callables in order in one worker thread."""
+    import functools
+    import threading
+
+    threads = []
+
+    def work(value: int, scale: int = 1) -> int:
+        threads.append(threading.get_ident())
+        return value * scale
+
+    results = await gather_sync(
+        functools.partial(work, 1),
+        functools.partial(work, 2, scale=10),
+        lambda: work(3),
+    )
+    assert results == [1, 20, 3]
+    assert len(set(threads)) == 1
+    assert threads[0] != threading.get_ident()
+
+    # Decorated sync callables run inline in the worker thread
+    decorated = smartasync(work)
+    assert await gather_sync(lambda: decorated(4), lambda: decorated(5)) == [4, 5]
+
+    assert await gather_sync() == []
+
+
+async def test_gather_sync_rejects_async_callables():
+    """Test gather_sync() refuses calls that return awaitables."""
+    import warnings
+
+    @smartasync
+    async def double(n: int) -> int:
+        return n * 2
+
+    assert await double(1) == 2  # Warm cache: later calls return coroutines
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", RuntimeWarning)  # No "never awaited"
+        try:
+            await gather_sync(lambda: double(5))
+            assert False, "Should have raised TypeError"
+        except TypeError as e:
+            assert "only sync callables" in str(e)
+
+
+def test_offloaded_contextvar_set_does_not_leak():
+    """Test that a context variable set in an offloaded call stays isolated."""
+    import contextvars
+    from concurrent.futures import ThreadPoolExecutor
+
+    var = contextvars.ContextVar("var", default="unset")
+
+    @smartasync
+    def setter():
+        var.set("leaked")
+
+    @smartasync
+    def getter():
+        return var.get()
+
+    async def main():
+        # One worker: both calls run on the same thread
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=1))
+        await setter()
+        return await getter()
+
+    # Fresh, empty context: the case that used to skip ctx.run
+    assert contextvars.Context().run(asyncio.run, main()) == "unset"
+
+
+def test_wrapper_metadata_partial_builtin_and_attributes():
+    """Test decorating callables without the usual function metadata."""
+    import functools
+
+    def add(x: int, y: int) -> int:
+        return x + y
+
+    wrapped_partial = smartasync(functools.partial(add, 1))
+    assert wrapped_partial(2) == 3
+
+    wrapped_len = smartasync(len)
+    assert wrapped_len.__name__ == "len"
+    assert wrapped_len([1, 2]) == 2
+
+    def tagged() -> str:
+        return "tagged"
+
+    tagged.marker = 1
+    wrapped_tagged = smartasync(tagged)
+    assert wrapped_tagged.marker == 1
+    assert wrapped_tagged() == "tagged"
+
+
 if __name__ == "__main__":
     # Test sync context
     test_sync_context()
@@ -486,8 +757,8 @@ if __name__ == "__main__":
     print("✅ Works with __slots__")
     print("✅ Asymmetric caching works correctly")
     print("✅ Cache reset available")
-    print("✅ BIDIRECTIONAL: Async methods work in sync context (asyncio.run)")
-    print("✅ BIDIRECTIONAL: Sync methods work in async context (asyncio.to_thread)")
+    print("✅ BIDIRECTIONAL: Async methods work in sync context (per-thread loop)")
+    print("✅ BIDIRECTIONAL: Sync methods work in async context (thread offload)")
     print("✅ Works with standalone functions (not just class methods)")
     print("✅ Error propagation works correctly")
     print("✅ Cache is per-method (shared between instances)")